@@ -3,6 +3,11 @@ from __future__ import annotations
 from pathlib import Path
 
 import os
+import re
+from functools import lru_cache
+from typing import Callable
+
+import numpy as np
 import pandas as pd
 import streamlit as st
 
@@ -10,39 +15,75 @@ from healthllm.dummy_data import DummyConfig, build_dummy_db
 from healthllm.ingest_steps import ingest_steps_export_xml
 from healthllm.qa import QAResult, answer_steps_question
 from healthllm.db import connect, init_schema
+from healthllm.sql_guard import UnsafeSQLError
 from healthllm.sqlgen_hf import hf_config_from_env
+from healthllm.sqlgen_templates import NoTemplateMatchError
+from healthllm.warmup import prewarm
 
 
 DEFAULT_DB = "data/ask_my_health.duckdb"
 
 
-def _check_data_availability(db_path: str | Path) -> tuple[bool, int, str | None, str | None]:
-    """Check if data exists and return (has_data, row_count, source_type, source_path)."""
+@st.cache_resource(show_spinner=False)
+def _get_con(db_path: str):
+    """Process-lifetime DuckDB connection (one per path) with the schema initialized once."""
+    con = connect(db_path)
+    init_schema(con)
+    return con
+
+
+@st.cache_data(show_spinner=False)
+def _check_data_availability_cached(db_path: str, mtime: float) -> tuple[bool, int, str | None, str | None]:
+    """Cached core of `_check_data_availability`; `mtime` keys the cache to the DB file state."""
     try:
-        con = connect(db_path)
-        init_schema(con)
-        
-        # Check data count
-        result = con.execute("SELECT COUNT(*) as count FROM daily_steps").fetchone()
-        count = result[0] if result else 0
-        
-        # Check source
-        source_result = con.execute(
-            "SELECT source_type, source_path FROM data_source WHERE id = 1"
-        ).fetchone()
-        
-        source_type = None
-        source_path = None
-        if source_result:
-            source_type = source_result[0]
-            source_path = source_result[1]
-        
-        con.close()
-        return (count > 0, count, source_type, source_path)
+        con = _get_con(db_path)
+
+        # One statement covers everything: an EXISTS probe for the boolean gate,
+        # the row count recorded at ingest time, and the source metadata.
+        try:
+            has_data, count, source_type, source_path = con.execute(
+                """
+                SELECT
+                  EXISTS (SELECT 1 FROM daily_steps),
+                  (SELECT row_count FROM data_source WHERE id = 1),
+                  (SELECT source_type FROM data_source WHERE id = 1),
+                  (SELECT source_path FROM data_source WHERE id = 1)
+                """
+            ).fetchone()
+        except Exception:
+            # DB file created before row_count existed; same shape minus that column.
+            has_data, source_type, source_path = con.execute(
+                """
+                SELECT
+                  EXISTS (SELECT 1 FROM daily_steps),
+                  (SELECT source_type FROM data_source WHERE id = 1),
+                  (SELECT source_path FROM data_source WHERE id = 1)
+                """
+            ).fetchone()
+            count = None
+
+        if count is None:
+            # Exact count is only decorative; scan for it just when data exists
+            # and the metadata row predates row_count.
+            count = (
+                con.execute("SELECT COUNT(*) FROM daily_steps").fetchone()[0] if has_data else 0
+            )
+
+        return (bool(has_data), count, source_type, source_path)
     except Exception:
         return (False, 0, None, None)
 
 
+def _check_data_availability(db_path: str | Path) -> tuple[bool, int, str | None, str | None]:
+    """Check if data exists and return (has_data, row_count, source_type, source_path)."""
+    try:
+        mtime = Path(db_path).stat().st_mtime
+    except OSError:
+        mtime = 0.0
+    return _check_data_availability_cached(str(db_path), mtime)
+
+
+@st.cache_data(show_spinner=False)
 def _get_hf_status() -> tuple[bool, str | None]:
     """Check if HF model is available and return (is_available, model_name)."""
     token = os.getenv("HF_TOKEN")
@@ -59,122 +100,279 @@ def _get_hf_status() -> tuple[bool, str | None]:
     return (False, None)
 
 
-def _format_answer(question: str, answer: int | float, sql: str, df: pd.DataFrame) -> str:
-    """
-    Format a numeric answer as a conversational sentence using pattern matching.
-    Uses question text, SQL structure, and dataframe context for intelligent formatting.
-    """
-    q_lower = question.lower()
-    sql_lower = sql.lower()
-    answer_int = int(answer)
-    
-    # Pattern 1: Comparison/difference queries
-    if "diff" in q_lower or "difference" in q_lower or ("compare" in q_lower and ("less" in q_lower or "more" in q_lower)):
-        # Check if SQL has comparison patterns (CTEs, subtraction, etc.)
-        if "current_year" in sql_lower or "last_year" in sql_lower or "yearly_totals" in sql_lower:
-            abs_diff = abs(answer_int)
-            if answer_int < 0:
-                return f"You walked **{abs_diff:,} fewer steps** this year compared to 2023."
-            elif answer_int > 0:
-                return f"You walked **{abs_diff:,} more steps** this year compared to 2023."
-            else:
-                return "You walked the **same number of steps** this year as in 2023."
-        # Generic comparison fallback
-        abs_diff = abs(answer_int)
-        if answer_int < 0:
-            return f"The difference is **{abs_diff:,} fewer steps**."
-        elif answer_int > 0:
-            return f"The difference is **{abs_diff:,} more steps**."
-        else:
-            return "The difference is **zero** - same number of steps."
-    
-    # Pattern 2: Total/Sum queries
-    if "sum" in sql_lower or "total" in q_lower or "how many" in q_lower:
-        if "this year" in q_lower or "2025" in q_lower or ("year" in q_lower and "this" in q_lower):
-            return f"You walked **{answer_int:,} steps** this year."
-        elif "this month" in q_lower or ("month" in q_lower and "this" in q_lower):
-            return f"You walked **{answer_int:,} steps** this month."
-        elif "last year" in q_lower or "2023" in q_lower or "2024" in q_lower:
-            year = "2023" if "2023" in q_lower else ("2024" if "2024" in q_lower else "last year")
-            return f"You walked **{answer_int:,} steps** in {year}."
-        elif "all time" in q_lower or "ever" in q_lower:
-            return f"You've walked **{answer_int:,} steps** in total."
-        else:
-            return f"You walked **{answer_int:,} steps**."
-    
-    # Pattern 3: Average queries
-    if "avg" in sql_lower or "average" in q_lower or "mean" in q_lower:
-        if "per day" in q_lower or "daily" in q_lower:
-            return f"Your average daily steps is **{answer_int:,}**."
-        elif "per week" in q_lower or "weekly" in q_lower:
-            return f"Your average weekly steps is **{answer_int:,}**."
-        else:
-            return f"Your average steps is **{answer_int:,}**."
-    
-    # Pattern 4: Maximum/Minimum queries
-    if "max" in sql_lower or "maximum" in q_lower or "most" in q_lower:
-        return f"Your maximum steps is **{answer_int:,}**."
-    if "min" in sql_lower or "minimum" in q_lower or "least" in q_lower:
-        return f"Your minimum steps is **{answer_int:,}**."
-    
-    # Pattern 5: Count queries
-    if "count" in sql_lower or "how many days" in q_lower:
-        if answer_int == 1:
-            return "You have data for **1 day**."
-        else:
-            return f"You have data for **{answer_int:,} days**."
-    
-    # Default: format as steps
-    return f"**{answer_int:,} steps**"
+# Keyword → tag maps for _format_answer_cached, scanned in one regex pass per string
+# instead of ~25 Python-level substring tests. Phrases that share a prefix with
+# a shorter keyword ("this year" vs "this") also emit the shorter keyword's tag,
+# since the longest alternative wins at a given position.
+_Q_TAGS: dict[str, tuple[str, ...]] = {
+    "difference": ("DIFF",),
+    "diff": ("DIFF",),
+    "compare": ("COMPARE",),
+    "less": ("LESS",),
+    "more": ("MORE",),
+    "total": ("TOTAL",),
+    "how many days": ("HOW_MANY_DAYS", "HOW_MANY"),
+    "how many": ("HOW_MANY",),
+    "this year": ("THIS_YEAR", "THIS"),
+    "this month": ("THIS_MONTH", "THIS"),
+    "last year": ("LAST_YEAR",),
+    "this": ("THIS",),
+    "year": ("YEAR",),
+    "month": ("MONTH",),
+    "2025": ("Y2025",),
+    "2024": ("Y2024",),
+    "2023": ("Y2023",),
+    "all time": ("ALL_TIME",),
+    "ever": ("EVER",),
+    "average": ("AVG_Q",),
+    "mean": ("AVG_Q",),
+    "per day": ("PER_DAY",),
+    "daily": ("PER_DAY",),
+    "per week": ("PER_WEEK",),
+    "weekly": ("PER_WEEK",),
+    "maximum": ("MAX_Q",),
+    "most": ("MAX_Q",),
+    "minimum": ("MIN_Q",),
+    "least": ("MIN_Q",),
+}
+
+_SQL_TAGS: dict[str, tuple[str, ...]] = {
+    "current_year": ("CMP_CTE",),
+    "last_year": ("CMP_CTE",),
+    "yearly_totals": ("CMP_CTE",),
+    "sum": ("SUM",),
+    "avg": ("AVG",),
+    "max": ("MAX",),
+    "min": ("MIN",),
+    "count": ("COUNT",),
+}
+
+
+def _compile_scanner(tag_map: dict[str, tuple[str, ...]]) -> re.Pattern[str]:
+    # Zero-width lookahead so overlapping keywords are all reported; longest
+    # alternatives first so phrases beat their prefixes at the same position.
+    keywords = sorted(tag_map, key=len, reverse=True)
+    return re.compile("(?=(" + "|".join(map(re.escape, keywords)) + "))")
+
+
+_Q_SCANNER = _compile_scanner(_Q_TAGS)
+_SQL_SCANNER = _compile_scanner(_SQL_TAGS)
+
+
+def _scan_tags(text: str, scanner: re.Pattern[str], tag_map: dict[str, tuple[str, ...]]) -> set[str]:
+    tags: set[str] = set()
+    for m in scanner.finditer(text):
+        tags.update(tag_map[m.group(1)])
+    return tags
+
+
+# Per-intent formatters, dispatched through _FORMATTERS below. Each takes the
+# integer answer and the question's tag set (for sub-branches like time frames).
+def _fmt_comparison_cte(n: int, qt: set[str]) -> str:
+    abs_diff = abs(n)
+    if n < 0:
+        return f"You walked **{abs_diff:,} fewer steps** this year compared to 2023."
+    elif n > 0:
+        return f"You walked **{abs_diff:,} more steps** this year compared to 2023."
+    return "You walked the **same number of steps** this year as in 2023."
+
+
+def _fmt_comparison(n: int, qt: set[str]) -> str:
+    abs_diff = abs(n)
+    if n < 0:
+        return f"The difference is **{abs_diff:,} fewer steps**."
+    elif n > 0:
+        return f"The difference is **{abs_diff:,} more steps**."
+    return "The difference is **zero** - same number of steps."
+
+
+def _fmt_sum(n: int, qt: set[str]) -> str:
+    if "THIS_YEAR" in qt or "Y2025" in qt or ("YEAR" in qt and "THIS" in qt):
+        return f"You walked **{n:,} steps** this year."
+    elif "THIS_MONTH" in qt or ("MONTH" in qt and "THIS" in qt):
+        return f"You walked **{n:,} steps** this month."
+    elif "LAST_YEAR" in qt or "Y2023" in qt or "Y2024" in qt:
+        year = "2023" if "Y2023" in qt else ("2024" if "Y2024" in qt else "last year")
+        return f"You walked **{n:,} steps** in {year}."
+    elif "ALL_TIME" in qt or "EVER" in qt:
+        return f"You've walked **{n:,} steps** in total."
+    return f"You walked **{n:,} steps**."
+
+
+def _fmt_avg(n: int, qt: set[str]) -> str:
+    if "PER_DAY" in qt:
+        return f"Your average daily steps is **{n:,}**."
+    elif "PER_WEEK" in qt:
+        return f"Your average weekly steps is **{n:,}**."
+    return f"Your average steps is **{n:,}**."
+
+
+def _fmt_max(n: int, qt: set[str]) -> str:
+    return f"Your maximum steps is **{n:,}**."
+
+
+def _fmt_min(n: int, qt: set[str]) -> str:
+    return f"Your minimum steps is **{n:,}**."
+
+
+def _fmt_count(n: int, qt: set[str]) -> str:
+    if n == 1:
+        return "You have data for **1 day**."
+    return f"You have data for **{n:,} days**."
+
+
+def _fmt_default(n: int, qt: set[str]) -> str:
+    return f"**{n:,} steps**"
+
+
+_FORMATTERS: dict[str, Callable[[int, set[str]], str]] = {
+    "comparison_cte": _fmt_comparison_cte,
+    "comparison": _fmt_comparison,
+    "sum": _fmt_sum,
+    "avg": _fmt_avg,
+    "max": _fmt_max,
+    "min": _fmt_min,
+    "count": _fmt_count,
+    "default": _fmt_default,
+}
 
 
-def _render_result(res: QAResult, question: str = "") -> None:
+def _classify_intent(qt: set[str], st_: set[str]) -> str:
+    """Map the scanned tag sets to a formatter key; priority order matters."""
+    if "DIFF" in qt or ("COMPARE" in qt and ("LESS" in qt or "MORE" in qt)):
+        # Check if SQL has comparison patterns (CTEs, subtraction, etc.)
+        return "comparison_cte" if "CMP_CTE" in st_ else "comparison"
+    if "SUM" in st_ or "TOTAL" in qt or "HOW_MANY" in qt:
+        return "sum"
+    if "AVG" in st_ or "AVG_Q" in qt:
+        return "avg"
+    if "MAX" in st_ or "MAX_Q" in qt:
+        return "max"
+    if "MIN" in st_ or "MIN_Q" in qt:
+        return "min"
+    if "COUNT" in st_ or "HOW_MANY_DAYS" in qt:
+        return "count"
+    return "default"
+
+
+@lru_cache(maxsize=256)
+def _format_answer_cached(question: str, answer_int: int, sql: str) -> str:
+    """Pure formatting core, memoized since chat replay re-renders past answers."""
+    qt = _scan_tags(question.casefold(), _Q_SCANNER, _Q_TAGS)
+    st_ = _scan_tags(sql.casefold(), _SQL_SCANNER, _SQL_TAGS)
+    return _FORMATTERS[_classify_intent(qt, st_)](answer_int, qt)
+
+
+def _is_real_number(x: object) -> bool:
+    """Scalar NA check (None/NaN) without pandas' general-purpose dispatch."""
+    return x is not None and x == x
+
+
+# Cap on points sent to the browser per chart; multi-year daily histories are
+# decimated to roughly this many samples before plotting.
+_MAX_CHART_POINTS = 500
+
+
+def _line_chart_series(df: pd.DataFrame, time_col: str, value_col: str) -> pd.Series:
+    """Build a datetime-indexed series for st.line_chart without copying the frame."""
+    col = df[time_col]
+    if col.dtype.kind == "M":
+        # Arrow-materialized DATE/TIMESTAMP columns are already datetime64.
+        idx = pd.DatetimeIndex(col)
+    else:
+        try:
+            # datetime.date objects (non-Arrow fallback): a single numpy cast
+            # instead of pandas' per-element parsing.
+            idx = pd.DatetimeIndex(np.asarray(col.tolist(), dtype="datetime64[D]"))
+        except (TypeError, ValueError):
+            idx = pd.to_datetime(col, cache=True, errors="coerce")
+    series = pd.Series(df[value_col].to_numpy(), index=idx)
+    # Template/LLM queries usually ORDER BY the time column already; sorting
+    # would allocate a reordered copy for nothing in that case.
+    if not series.index.is_monotonic_increasing:
+        series = series.sort_index()
+    if len(series) > _MAX_CHART_POINTS:
+        series = series.iloc[:: len(series) // _MAX_CHART_POINTS]
+    return series
+
+
+def _build_render_entry(res: QAResult, question: str = "") -> dict:
+    """
+    Precompute everything needed to display an answer (provider caption, formatted
+    answer, plot series). Built once per answer and stored in session state so
+    chat-history replay on later reruns skips formatting and datetime conversion.
+    """
     # User-friendly provider indicator
     if "hf" in res.used_provider.lower() and "fallback" not in res.used_provider.lower():
-        st.caption("Using LLM mode")
+        provider_line = "Using LLM mode"
     elif "template" in res.used_provider.lower():
-        st.caption("Using template mode")
+        provider_line = "Using template mode"
     else:
-        st.caption(f"Mode: {res.used_provider}")
-    
-    with st.expander("View SQL query"):
-        st.code(res.sql, language="sql")
+        provider_line = f"Mode: {res.used_provider}"
+
+    entry: dict = {
+        "provider_line": provider_line,
+        "sql": res.sql,
+        "answer_md": None,
+        "metric": None,
+        "dataframe": None,
+        "plots": [],
+    }
 
     if res.scalar_answer is not None:
         answer_value = res.scalar_answer
-        if pd.notna(answer_value):
-            # Format as conversational sentence
-            formatted_text = _format_answer(question, answer_value, res.sql, res.dataframe)
-            st.markdown(formatted_text)
-            # Keep the metric for visual reference
-            st.metric("Answer", f"{int(answer_value):,}" if pd.notna(answer_value) else "0")
+        if _is_real_number(answer_value):
+            # Format as conversational sentence; keep the metric for visual reference
+            answer_int = int(answer_value)
+            entry["answer_md"] = _format_answer_cached(question, answer_int, res.sql)
+            entry["metric"] = f"{answer_int:,}"
         else:
-            st.markdown("**No data available.**")
-        return
+            entry["answer_md"] = "**No data available.**"
+        return entry
 
-    st.dataframe(res.dataframe, use_container_width=True)
+    entry["dataframe"] = res.dataframe
 
     # Optional plot for common shapes
     cols = [c.lower() for c in res.dataframe.columns]
-    if "date" in cols and "steps" in cols:
-        df = res.dataframe.copy()
+    time_key = next((c for c in ("date", "week_start") if c in cols), None)
+    if time_key is not None and "steps" in cols:
         # Keep original column names
-        date_col = res.dataframe.columns[cols.index("date")]
+        time_col = res.dataframe.columns[cols.index(time_key)]
         steps_col = res.dataframe.columns[cols.index("steps")]
-        df[date_col] = pd.to_datetime(df[date_col])
-        df = df.sort_values(date_col)
-        st.line_chart(df.set_index(date_col)[steps_col])
+        entry["plots"].append(_line_chart_series(res.dataframe, time_col, steps_col))
 
-    if "week_start" in cols and "steps" in cols:
-        df = res.dataframe.copy()
-        week_col = res.dataframe.columns[cols.index("week_start")]
-        steps_col = res.dataframe.columns[cols.index("steps")]
-        df[week_col] = pd.to_datetime(df[week_col])
-        df = df.sort_values(week_col)
-        st.line_chart(df.set_index(week_col)[steps_col])
+    return entry
+
+
+def _render_entry(entry: dict) -> None:
+    st.caption(entry["provider_line"])
+
+    with st.expander("View SQL query"):
+        st.code(entry["sql"], language="sql")
+
+    if entry["answer_md"] is not None:
+        st.markdown(entry["answer_md"])
+        if entry["metric"] is not None:
+            st.metric("Answer", entry["metric"])
+        return
+
+    st.dataframe(entry["dataframe"], use_container_width=True)
+    for series in entry["plots"]:
+        st.line_chart(series)
+
+
+def _render_result(res: QAResult, question: str = "") -> dict:
+    """Render a fresh answer and return its precomputed render entry."""
+    entry = _build_render_entry(res, question)
+    _render_entry(entry)
+    return entry
 
 
 st.set_page_config(page_title="ask-my-health (steps)", layout="wide")
+
+# Warm the DB page cache and the HF endpoint while the user is still reading
+# the page; no-op on reruns.
+prewarm(DEFAULT_DB, hf_config_from_env())
 st.title("ask-my-health (steps-only v1)")
 st.write("Have a conversation with your step data and get reliable insights.")
 
@@ -188,18 +386,21 @@ all_sample_queries = [
     "How many steps did I walk this month?",
 ]
 
+@st.cache_data(show_spinner=False)
+def _sample_queries_block(page: int) -> str:
+    """Preformatted markdown for one page of sample queries; only recomputed on page change."""
+    start_idx = page * 3
+    queries = all_sample_queries[start_idx : start_idx + 3]
+    return "\n".join(f"```\n{q}\n```" for q in queries)
+
+
 with st.expander("💡 Try these sample queries", expanded=False):
     # Show 3 queries at a time
     if "query_page" not in st.session_state:
         st.session_state.query_page = 0
-    
-    start_idx = st.session_state.query_page * 3
-    end_idx = min(start_idx + 3, len(all_sample_queries))
-    current_queries = all_sample_queries[start_idx:end_idx]
-    
-    for query in current_queries:
-        st.code(query, language=None)
-    
+
+    st.markdown(_sample_queries_block(st.session_state.query_page))
+
     # Navigation buttons if there are more queries
     if len(all_sample_queries) > 3:
         col1, col2, col3 = st.columns([1, 1, 1])
@@ -252,6 +453,8 @@ with st.sidebar:
     seed = st.number_input("Seed", min_value=0, max_value=10_000, value=42, step=1, key="dummy_seed")
     if st.button("Generate sample data"):
         path = build_dummy_db(db_path, DummyConfig(days=int(days), seed=int(seed)))
+        _get_con.clear()
+        _check_data_availability_cached.clear()
         st.success("Sample data created successfully! You can now ask questions.")
         st.rerun()  # Refresh to show updated data status
 
@@ -263,6 +466,8 @@ with st.sidebar:
         else:
             try:
                 res = ingest_steps_export_xml(xml_path=xml_path, db_path=db_path, overwrite=True)
+                _get_con.clear()
+                _check_data_availability_cached.clear()
                 st.success(f"Your data is ready! Found {res.step_records_seen:,} step records across {res.days} days.")
                 st.rerun()  # Refresh to show updated data status
             except Exception as e:
@@ -285,13 +490,11 @@ with st.sidebar:
 
 st.header("Ask a question")
 
-# Check data availability for empty state
-has_data, row_count, source_type, source_path = _check_data_availability(db_path)
-
+# Data availability was already checked once in the sidebar; reuse those locals.
 if "messages" not in st.session_state:
     st.session_state.messages = []
 if "results" not in st.session_state:
-    st.session_state.results = []  # Store QAResult objects for re-rendering
+    st.session_state.results = []  # Store precomputed render entries for replay
 
 # Track which result index we're on (results only exist for assistant messages)
 result_idx = 0
@@ -302,11 +505,8 @@ for i, m in enumerate(st.session_state.messages):
         if m["role"] == "assistant" and result_idx < len(st.session_state.results):
             result = st.session_state.results[result_idx]
             if result is not None:
-                # Get the question from the previous user message
-                question = ""
-                if i > 0 and st.session_state.messages[i - 1]["role"] == "user":
-                    question = st.session_state.messages[i - 1]["content"]
-                _render_result(result, question=question)
+                # Replay from the cached render entry; nothing is recomputed.
+                _render_entry(result)
             else:
                 # Only show message content for errors
                 if m["content"]:
@@ -340,24 +540,21 @@ elif question:
 
     with st.chat_message("assistant"):
         with st.spinner("Processing your question..."):
-            # Check HF status for error handling
-            hf_available_check, _ = _get_hf_status()
-            
+            # Reuse the HF status computed in the sidebar for error handling.
+            hf_available_check = hf_available
+
             try:
                 res = answer_steps_question(
                     question=question, db_path=db_path, force_templates=force_templates, hf_strict=hf_strict
                 )
-                _render_result(res, question=question)
+                entry = _render_result(res, question=question)
                 # Store empty string - the result will be rendered, not the message content
                 st.session_state.messages.append({"role": "assistant", "content": ""})
-                st.session_state.results.append(res)  # Store the result for re-rendering
+                st.session_state.results.append(entry)  # Store the render entry for replay
             except Exception as e:  # noqa: BLE001
                 error_str = str(e)
-                
+
                 # Check for non-step questions
-                from healthllm.sqlgen_templates import NoTemplateMatchError
-                from healthllm.sql_guard import UnsafeSQLError
-                
                 if isinstance(e, NoTemplateMatchError):
                     st.error("**This question is not about steps**")
                     st.markdown(
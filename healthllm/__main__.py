@@ -3,9 +3,6 @@ from __future__ import annotations
 import argparse
 from pathlib import Path
 
-from healthllm.dummy_data import DummyConfig, build_dummy_db
-from healthllm.ingest_steps import ingest_steps_export_xml
-
 
 def main() -> None:
     parser = argparse.ArgumentParser(prog="healthllm", description="ask-my-health utilities (steps-only MVP).")
@@ -29,11 +26,16 @@ def main() -> None:
     args = parser.parse_args()
 
     if args.cmd == "init-dummy":
+        # Imported lazily so `--help` (and bad invocations) don't pay for pandas/duckdb.
+        from healthllm.dummy_data import DummyConfig, build_dummy_db
+
         path = build_dummy_db(Path(args.db), DummyConfig(days=args.days, seed=args.seed))
         print(f"Wrote dummy data to {path}")
         return
 
     if args.cmd == "ingest-steps":
+        from healthllm.ingest_steps import ingest_steps_export_xml
+
         res = ingest_steps_export_xml(xml_path=args.xml, db_path=args.db, overwrite=args.overwrite)
         print(
             f"Ingested {res.step_records_seen} step records "
@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+import threading
+import weakref
 from dataclasses import dataclass
 from pathlib import Path
 
@@ -22,7 +24,34 @@ def connect(db_path: str | Path) -> duckdb.DuckDBPyConnection:
     return duckdb.connect(str(path))
 
 
+# Connections whose schema has already been initialized, so repeated
+# init_schema calls on a long-lived connection skip the DDL round-trips.
+# The lock keeps the sentinel safe now that warmup threads may race the
+# main thread into init_schema.
+_initialized_connections: weakref.WeakSet[duckdb.DuckDBPyConnection] = weakref.WeakSet()
+_init_lock = threading.Lock()
+
+
 def init_schema(con: duckdb.DuckDBPyConnection) -> None:
+    with _init_lock:
+        if con in _initialized_connections:
+            return
+        _init_schema_locked(con)
+
+
+def _init_schema_locked(con: duckdb.DuckDBPyConnection) -> None:
+    # Fresh connection to an already-built file: one catalog lookup is cheaper
+    # than parsing and planning the DDL statements below.
+    existing = con.execute(
+        "SELECT COUNT(*) FROM duckdb_tables() WHERE table_name IN ('daily_steps', 'data_source')"
+    ).fetchone()[0]
+    if existing == 2:
+        # Files created before row_count existed still get INSERTs into that
+        # column from the write paths; add it in place so old databases keep
+        # working.
+        con.execute("ALTER TABLE data_source ADD COLUMN IF NOT EXISTS row_count BIGINT")
+        _initialized_connections.add(con)
+        return
     con.execute(
         """
         CREATE TABLE IF NOT EXISTS daily_steps (
@@ -31,16 +60,21 @@ def init_schema(con: duckdb.DuckDBPyConnection) -> None:
         )
         """
     )
-    # Add metadata table to track data source
+    # Add metadata table to track data source. source_type only ever holds a
+    # handful of values, so store it as a dictionary-encoded ENUM rather than
+    # TEXT; it still comes back to Python as a plain str.
+    con.execute("CREATE TYPE IF NOT EXISTS source_kind AS ENUM ('dummy', 'export_xml', 'unknown')")
     con.execute(
         """
         CREATE TABLE IF NOT EXISTS data_source (
           id INTEGER PRIMARY KEY,
-          source_type TEXT NOT NULL,
+          source_type source_kind NOT NULL,
           source_path TEXT,
+          row_count BIGINT,
           last_updated TIMESTAMP NOT NULL
         )
         """
     )
+    _initialized_connections.add(con)
 
 
@@ -2,10 +2,9 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 from datetime import date, datetime, timedelta
-import math
 from pathlib import Path
-import random
 
+import numpy as np
 import pandas as pd
 
 from healthllm.db import Schema, connect, init_schema
@@ -18,31 +17,33 @@ class DummyConfig:
     start_date: date | None = None
 
 
+# Mon..Sun multipliers; built once so each call is a single fancy-index.
+_WEEKDAY_BOOST = np.array([0.95, 1.0, 1.05, 1.03, 1.02, 1.15, 1.1])
+
+
 def generate_daily_steps(cfg: DummyConfig) -> pd.DataFrame:
     """Generate deterministic daily step totals for demo/testing."""
     start = cfg.start_date or (date.today() - timedelta(days=cfg.days - 1))
-    rng = random.Random(cfg.seed)
+    rng = np.random.default_rng(cfg.seed)
 
-    dates = [start + timedelta(days=i) for i in range(cfg.days)]
+    dates = pd.date_range(start, periods=cfg.days, freq="D")
 
-    # A stable, human-looking pattern: weekly rhythm + gentle trend + noise.
-    weekday_boost = [0.95, 1.0, 1.05, 1.03, 1.02, 1.15, 1.1]  # Mon..Sun
+    # A stable, human-looking pattern: weekly rhythm + gentle trend + noise,
+    # computed as whole-array NumPy ops instead of a Python loop over days.
     base = 7200
     trend_start, trend_end = -500.0, 700.0
     noise_scale = 900.0
 
-    steps = []
-    for i, d in enumerate(dates):
-        mult = weekday_boost[d.weekday()]
-        frac = 0.0 if cfg.days <= 1 else i / (cfg.days - 1)
-        trend = trend_start + (trend_end - trend_start) * frac
-        noise = rng.gauss(0.0, noise_scale)
-        # Add a subtle seasonal wave so plots look nicer.
-        seasonal = 250.0 * math.sin(2 * math.pi * frac)
-        s = (base + trend + seasonal + noise) * mult
-        steps.append(int(max(0, round(s))))
+    i = np.arange(cfg.days)
+    frac = np.zeros(cfg.days) if cfg.days <= 1 else i / (cfg.days - 1)
+    trend = trend_start + (trend_end - trend_start) * frac
+    noise = rng.normal(0.0, noise_scale, cfg.days)
+    # Add a subtle seasonal wave so plots look nicer.
+    seasonal = 250.0 * np.sin(2 * np.pi * frac)
+    mult = _WEEKDAY_BOOST.take((i + start.weekday()) % 7)
+    steps = np.maximum(0, np.rint((base + trend + seasonal + noise) * mult)).astype(np.int64)
 
-    return pd.DataFrame({"date": pd.to_datetime(dates), "steps": steps})
+    return pd.DataFrame({"date": dates, "steps": steps})
 
 
 def build_dummy_db(db_path: str | Path, cfg: DummyConfig = DummyConfig()) -> Path:
@@ -56,19 +57,21 @@ def build_dummy_db(db_path: str | Path, cfg: DummyConfig = DummyConfig()) -> Pat
 
     # Overwrite the table contents for reproducibility.
     con.execute(f"DELETE FROM {Schema.DAILY_STEPS_TABLE}")
-    con.register("df_daily_steps", df)
-    con.execute(
-        f"INSERT INTO {Schema.DAILY_STEPS_TABLE} SELECT CAST(date AS DATE) AS date, CAST(steps AS BIGINT) AS steps FROM df_daily_steps"
+    # Appender path: pre-cast in pandas so DuckDB loads the frame in one
+    # vectorized pass without the register + INSERT ... SELECT round-trip.
+    con.append(
+        Schema.DAILY_STEPS_TABLE,
+        df.assign(date=df["date"].dt.date, steps=df["steps"].astype("int64")),
     )
     
     # Set metadata to track source
     con.execute(f"DELETE FROM {Schema.DATA_SOURCE_TABLE}")
     con.execute(
         f"""
-        INSERT INTO {Schema.DATA_SOURCE_TABLE} (id, source_type, source_path, last_updated)
-        VALUES (1, 'dummy', NULL, ?)
+        INSERT INTO {Schema.DATA_SOURCE_TABLE} (id, source_type, source_path, row_count, last_updated)
+        VALUES (1, 'dummy', NULL, ?, ?)
         """,
-        [datetime.now()]
+        [int(df.shape[0]), datetime.now()]
     )
     con.close()
     return path
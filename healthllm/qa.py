@@ -1,6 +1,8 @@
 from __future__ import annotations
 
+import atexit
 from dataclasses import dataclass
+from functools import lru_cache
 from pathlib import Path
 from typing import Any
 
@@ -8,8 +10,13 @@ import duckdb
 import pandas as pd
 
 from healthllm.db import connect, init_schema
-from healthllm.sql_guard import SqlPolicy, validate_sql
-from healthllm.sqlgen_hf import HuggingFaceSqlGenError, hf_config_from_env, generate_sql_hf
+from healthllm.sql_guard import SqlPolicy, validate_sql, validate_sql_batch
+from healthllm.sqlgen_hf import (
+    HuggingFaceSqlGenError,
+    hf_config_from_env,
+    generate_sql_hf,
+    generate_sql_hf_batch,
+)
 from healthllm.sqlgen_templates import generate_sql_from_templates
 
 
@@ -21,8 +28,36 @@ class QAResult:
     used_provider: str  # "hf" or "templates"
 
 
+try:
+    import pyarrow  # noqa: F401  (pulled in transitively by streamlit)
+
+    _HAVE_ARROW = True
+except ImportError:  # pragma: no cover
+    _HAVE_ARROW = False
+
+
+@lru_cache(maxsize=8)
+def _get_con(db_path: str) -> duckdb.DuckDBPyConnection:
+    # Opening the database and (re)checking the schema are the expensive
+    # parts; do them once per path and hand out cursors per question.
+    con = connect(db_path)
+    init_schema(con)
+    atexit.register(con.close)
+    return con
+
+
 def _execute_sql(con: duckdb.DuckDBPyConnection, sql: str) -> pd.DataFrame:
     rel = con.sql(sql)
+    if rel.columns == ["answer"]:
+        # Single-number questions ("how many steps this year") produce one
+        # answer column; fetch the raw rows and skip the full columnar
+        # materialization, which costs more than the query itself here.
+        return pd.DataFrame(rel.fetchall(), columns=["answer"])
+    if _HAVE_ARROW:
+        # Materialize through Arrow: columnar hand-off with no object-dtype
+        # inference, and DATE columns come back as datetime64 instead of
+        # per-row Python date objects.
+        return rel.fetch_arrow_table().to_pandas(date_as_object=False)
     return rel.df()
 
 
@@ -64,10 +99,10 @@ def answer_steps_question(
 
     sql = validate_sql(sql, SqlPolicy(allowed_tables=("daily_steps",)))
 
-    con = connect(db_path)
-    init_schema(con)
-    df = _execute_sql(con, sql)
-    con.close()
+    # Cursors share the cached connection's catalog but give each question
+    # its own execution state, so results never interleave.
+    cur = _get_con(str(Path(db_path).expanduser().resolve())).cursor()
+    df = _execute_sql(cur, sql)
 
     scalar = None
     if df.shape[0] == 1 and "answer" in df.columns:
@@ -76,3 +111,52 @@ def answer_steps_question(
     return QAResult(sql=sql, dataframe=df, scalar_answer=scalar, used_provider=used_provider)
 
 
+def answer_steps_questions(
+    *,
+    questions: list[str],
+    db_path: str | Path = "data/ask_my_health.duckdb",
+    force_templates: bool = False,
+    hf_strict: bool = False,
+) -> list[QAResult]:
+    """
+    Answer several questions at once, sharing one HF round trip.
+
+    With HF available, all questions go out in a single batched completion
+    (the schema preamble is a shared prefix, so N questions cost roughly one
+    prefill). On batch failure — or without a token — each question falls
+    back to the regular single-question path.
+    """
+    stripped = [q.strip() for q in questions]
+    if any(not q for q in stripped):
+        raise ValueError("Question is empty.")
+    if not stripped:
+        return []
+
+    hf_cfg = None if force_templates else hf_config_from_env()
+    sqls: list[str] | None = None
+    if hf_cfg is not None:
+        try:
+            sqls = generate_sql_hf_batch(stripped, hf_cfg)
+        except HuggingFaceSqlGenError:
+            if hf_strict:
+                raise
+            sqls = None
+
+    if sqls is None:
+        return [
+            answer_steps_question(
+                question=q, db_path=db_path, force_templates=force_templates, hf_strict=hf_strict
+            )
+            for q in stripped
+        ]
+
+    sqls = validate_sql_batch(sqls, SqlPolicy(allowed_tables=("daily_steps",)))
+    cur = _get_con(str(Path(db_path).expanduser().resolve())).cursor()
+    results: list[QAResult] = []
+    for sql in sqls:
+        df = _execute_sql(cur, sql)
+        scalar = None
+        if df.shape[0] == 1 and "answer" in df.columns:
+            scalar = df.iloc[0]["answer"]
+        results.append(QAResult(sql=sql, dataframe=df, scalar_answer=scalar, used_provider="hf"))
+    return results
@@ -1,19 +1,26 @@
 from __future__ import annotations
 
 import re
-from dataclasses import dataclass
-from typing import Iterable
+from dataclasses import dataclass, field
+from functools import lru_cache
 
 class UnsafeSQLError(ValueError):
     pass
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class SqlPolicy:
     allowed_tables: tuple[str, ...] = ("daily_steps",)
+    # Lowercased frozenset view of allowed_tables, built once per policy so
+    # per-reference membership checks are O(1). Excluded from eq/hash, which
+    # stay keyed on allowed_tables alone.
+    _allowed_set: frozenset[str] = field(init=False, repr=False, compare=False)
 
+    def __post_init__(self) -> None:
+        object.__setattr__(self, "_allowed_set", frozenset(t.lower() for t in self.allowed_tables))
 
-DISALLOWED_KEYWORDS = (
+
+DISALLOWED_KEYWORDS: tuple[str, ...] = (
     "INSERT",
     "UPDATE",
     "DELETE",
@@ -26,65 +33,106 @@ DISALLOWED_KEYWORDS = (
 )
 
 # Known SQL functions/constants that should not be treated as table names
-SQL_FUNCTIONS_AND_CONSTANTS = {
+SQL_FUNCTIONS_AND_CONSTANTS: frozenset[str] = frozenset({
     "current_date",
     "current_time",
     "current_timestamp",
     "now",
     "today",
     "date",  # 'date' is a column name, not a table; if it appears after FROM/JOIN, it's incorrect usage
-}
+})
+
+
+_FENCE_SQL_RE = re.compile(r"^```sql\s*", re.IGNORECASE)
+_FENCE_OPEN_RE = re.compile(r"^```")
+_FENCE_CLOSE_RE = re.compile(r"```$")
 
 
 def _normalize_sql(sql: str) -> str:
     s = sql.strip()
     # Strip common code fences.
-    if s.lower().startswith("```"):
-        s = re.sub(r"^```sql\s*", "", s, flags=re.IGNORECASE)
-        s = re.sub(r"^```", "", s)
-        s = re.sub(r"```$", "", s)
+    if s.startswith("```"):
+        s = _FENCE_SQL_RE.sub("", s)
+        s = _FENCE_OPEN_RE.sub("", s)
+        s = _FENCE_CLOSE_RE.sub("", s)
     return s.strip()
 
 
-_TABLE_REF_RE = re.compile(r"\b(?:FROM|JOIN)\s+([a-zA-Z_][\w\.]*)", re.IGNORECASE)
-_CTE_NAME_RE = re.compile(r"\bWITH\s+([a-zA-Z_][\w\.]*)\s+AS", re.IGNORECASE)
+_TOKEN_RE = re.compile(r"[A-Za-z_][\w\.]*|[(),;]")
+
+_DISALLOWED_SET = frozenset(DISALLOWED_KEYWORDS)
+
+# Longest keyword the scan ever compares against; longer tokens are
+# identifiers and never need an uppercased copy.
+_MAX_KW_LEN = max(map(len, _DISALLOWED_SET | {"SELECT", "FROM", "JOIN", "WITH", "AS"}))
 
 
-def _find_cte_names(sql: str) -> set[str]:
-    """Extract CTE (Common Table Expression) names from WITH clauses."""
+def _scan_statement(sql: str, starts_with_cte: bool, allowed: frozenset[str]) -> bool:
+    """
+    Single token pass over the statement: reject disallowed keywords and
+    check each table reference against `allowed` as it streams past (CTE
+    names declare before use, so they are known by the time they are
+    referenced). Raises on the first unknown name; returns whether any
+    table was referenced at all.
+    """
+    found_table = False
     cte_names: set[str] = set()
-    # Match "WITH cte_name AS" patterns
-    for m in _CTE_NAME_RE.finditer(sql):
-        raw = m.group(1)
-        cte_name = raw.split(".")[-1].lower()
-        cte_names.add(cte_name)
-    
-    # Also handle multiple CTEs: "WITH cte1 AS (...), cte2 AS (...)"
-    # This is a simplified approach - find all identifiers after WITH and before AS
-    if sql.upper().strip().startswith("WITH"):
-        # Find the WITH clause section (up to the main SELECT)
-        upper_sql = sql.upper()
-        with_end = upper_sql.find("SELECT", upper_sql.find("WITH") + 4)
-        if with_end > 0:
-            with_clause = sql[:with_end]
-            # Match patterns like "cte_name AS" or ", cte_name AS"
-            cte_pattern = re.compile(r"(?:^|\s|,)\s*([a-zA-Z_][\w\.]*)\s+AS\s*\(", re.IGNORECASE | re.MULTILINE)
-            for m in cte_pattern.finditer(with_clause):
-                raw = m.group(1)
-                cte_name = raw.split(".")[-1].lower()
-                cte_names.add(cte_name)
-    
-    return cte_names
-
-
-def _find_tables(sql: str) -> Iterable[str]:
-    for m in _TABLE_REF_RE.finditer(sql):
-        raw = m.group(1)
-        # Drop simple qualifiers like schema.table -> table
-        table_name = raw.split(".")[-1].lower()
-        # Skip SQL functions/constants
-        if table_name not in SQL_FUNCTIONS_AND_CONSTANTS:
-            yield table_name
+    in_with_prologue = starts_with_cte
+    depth = 0
+    prev_kw = ""  # uppercased previous word token; reset by punctuation
+    pending_cte = ""  # candidate CTE head name, confirmed by an opening paren
+
+    for tok in _TOKEN_RE.findall(sql):
+        if tok == "(":
+            # "name AS (" at the top of the WITH clause: the paren confirms
+            # the pending name really is a CTE head, not a stray alias.
+            if pending_cte:
+                cte_names.add(pending_cte)
+                pending_cte = ""
+            depth += 1
+            prev_kw = ""
+            continue
+        if tok == ")":
+            depth -= 1
+            prev_kw = ""
+            pending_cte = ""
+            continue
+        if tok in (",", ";"):
+            prev_kw = ""
+            pending_cte = ""
+            continue
+
+        # Uppercase only tokens short enough to be a keyword; everything else
+        # flows through as-is (it only ever feeds case-insensitive state).
+        up = tok.upper() if len(tok) <= _MAX_KW_LEN else tok
+        if up in _DISALLOWED_SET:
+            raise UnsafeSQLError(f"Disallowed keyword found: {up}")
+
+        if prev_kw in ("FROM", "JOIN"):
+            # Drop simple qualifiers like schema.table -> table, and skip
+            # SQL functions/constants.
+            name = tok.split(".")[-1].lower()
+            if name not in SQL_FUNCTIONS_AND_CONSTANTS:
+                if name not in allowed and name not in cte_names:
+                    raise UnsafeSQLError(f"Query references non-allowed tables: ['{name}']")
+                found_table = True
+        elif up == "AS" and in_with_prologue and depth == 0 and prev_kw:
+            # Only depth 0 of the WITH clause can declare CTEs; column
+            # aliases inside a CTE body sit at depth >= 1 and must not be
+            # able to whitelist a table name.
+            pending_cte = prev_kw.lower()
+        elif pending_cte and tok.upper() in ("MATERIALIZED", "NOT"):
+            # "AS [NOT] MATERIALIZED (" keeps the head pending.
+            pass
+        elif up == "SELECT" and in_with_prologue and depth == 0:
+            in_with_prologue = False
+            pending_cte = ""
+        else:
+            pending_cte = ""
+
+        prev_kw = up
+
+    return found_table
 
 
 def validate_sql(sql: str, policy: SqlPolicy = SqlPolicy()) -> str:
@@ -96,40 +144,57 @@ def validate_sql(sql: str, policy: SqlPolicy = SqlPolicy()) -> str:
     - SELECT-only (CTEs ok)
     - only allow-listed tables
     """
+    return _validate_sql_cached(sql, policy)
+
+
+def validate_sql_batch(sqls: list[str], policy: SqlPolicy = SqlPolicy()) -> list[str]:
+    """
+    Validate several statements against one policy; raises on the first
+    unsafe statement.
+
+    The scan is pure-Python string work, so threading it would just contend
+    on the GIL — a plain loop over the cached single-statement validator is
+    the fast path for CPython, and repeated statements hit the cache.
+    """
+    return [_validate_sql_cached(s, policy) for s in sqls]
+
+
+@lru_cache(maxsize=512)
+def _validate_sql_cached(sql: str, policy: SqlPolicy) -> str:
+    # Both arguments are hashable (SqlPolicy is frozen), so a repeated
+    # statement skips normalization and the token scan entirely. Rejections
+    # raise and are not cached, so every invalid statement is re-checked.
+
+    # For input that is not fenced or whitespace-padded (the common case),
+    # the SELECT/WITH gate can fire before normalization even runs.
+    if sql and not sql.startswith(("```", " ", "\t", "\n", "\r")):
+        if not sql[:6].upper().startswith(("SELECT", "WITH")):
+            raise UnsafeSQLError("Only SELECT queries are allowed.")
+
     sql = _normalize_sql(sql)
     if not sql:
         raise UnsafeSQLError("Empty SQL.")
 
-    upper = sql.upper()
-    if not upper.lstrip().startswith("SELECT") and not upper.lstrip().startswith("WITH"):
+    # Cheap prefix gate: uppercasing a six-character slice decides the
+    # SELECT/WITH requirement, so DML statements are rejected before any
+    # full-length copy or token scan. (_normalize_sql already stripped the
+    # ends.)
+    head = sql[:6].upper()
+    if not head.startswith(("SELECT", "WITH")):
         raise UnsafeSQLError("Only SELECT queries are allowed.")
 
     # Prevent multiple statements.
     # (We allow a single trailing semicolon, but not internal statement separators.)
-    stripped = sql.strip()
-    if ";" in stripped[:-1]:
+    if ";" in sql[:-1]:
         raise UnsafeSQLError("Only a single SQL statement is allowed.")
-    if stripped.endswith(";"):
-        sql = stripped[:-1].strip()
-        upper = sql.upper()
+    if sql.endswith(";"):
+        sql = sql[:-1].rstrip()
 
-    for kw in DISALLOWED_KEYWORDS:
-        if kw in upper:
-            raise UnsafeSQLError(f"Disallowed keyword found: {kw}")
-
-    tables = {t.lower() for t in _find_tables(sql)}
-    if not tables:
+    # One token walk handles keyword screening and the table allow-list
+    # together; an unknown table rejects mid-scan without finishing the pass.
+    if not _scan_statement(sql, head.startswith("WITH"), policy._allowed_set):
         raise UnsafeSQLError("No table referenced.")
 
-    # Extract CTE names if the query uses WITH clauses
-    cte_names = _find_cte_names(sql)
-    
-    # Allow both policy tables and CTE names
-    allowed = {t.lower() for t in policy.allowed_tables} | cte_names
-    unknown = sorted(t for t in tables if t not in allowed)
-    if unknown:
-        raise UnsafeSQLError(f"Query references non-allowed tables: {unknown}")
-
     return sql
 
 
@@ -1,8 +1,10 @@
 from __future__ import annotations
 
+import json
 import os
 import re
 from dataclasses import dataclass
+from functools import lru_cache
 from typing import Any
 
 from huggingface_hub import InferenceClient
@@ -40,11 +42,43 @@ SQL:
 """
 
 
+@lru_cache(maxsize=4)
+def _get_client(token: str) -> InferenceClient:
+    # One client per token: reuses the underlying HTTP session (keep-alive,
+    # no per-question TLS handshake) and skips client setup on every call.
+    return InferenceClient(api_key=token)
+
+
+BATCH_PROMPT_TEMPLATE = """You are an expert at writing DuckDB SQL.
+
+Return ONLY a JSON array of SQL query strings, one per question, in the same
+order as the questions (no explanations, no markdown).
+Rules for every query:
+- Must be a single SELECT statement.
+- Query only the table daily_steps(date DATE, steps BIGINT).
+- Do not use any other tables.
+- If the question asks for a single number, return exactly one row with column alias answer.
+- Use date filters on daily_steps.date.
+
+Schema:
+daily_steps(date DATE, steps BIGINT)
+
+Questions:
+{questions}
+JSON:
+"""
+
+
+_FENCE_SQL_RE = re.compile(r"^```sql\s*", re.IGNORECASE)
+_FENCE_OPEN_RE = re.compile(r"^```")
+_FENCE_CLOSE_RE = re.compile(r"```$")
+
+
 def _strip_code_fences(text: str) -> str:
     s = text.strip()
-    s = re.sub(r"^```sql\s*", "", s, flags=re.IGNORECASE)
-    s = re.sub(r"^```", "", s)
-    s = re.sub(r"```$", "", s)
+    s = _FENCE_SQL_RE.sub("", s)
+    s = _FENCE_OPEN_RE.sub("", s)
+    s = _FENCE_CLOSE_RE.sub("", s)
     return s.strip()
 
 
@@ -58,32 +92,95 @@ def _extract_sql_from_generated_text(prompt: str, generated: str) -> str:
 def generate_sql_hf(question: str, cfg: HfConfig) -> str:
     """
     Generate SQL using Hugging Face Inference API with chat completions.
-    
+
     Uses InferenceClient (like the notebook) which supports chat completions API,
     required for models like deepseek-ai/DeepSeek-V3.2:novita.
+
+    Results are memoized per (normalized question, config), so repeating a
+    question within a session skips the network round-trip entirely.
     """
-    prompt = PROMPT_TEMPLATE.format(question=question.strip())
-    
+    return _generate_sql_hf_cached(question.strip(), cfg)
+
+
+@lru_cache(maxsize=256)
+def _generate_sql_hf_cached(question: str, cfg: HfConfig) -> str:
+    prompt = PROMPT_TEMPLATE.format(question=question)
+
     try:
-        client = InferenceClient(api_key=cfg.token)
-        
-        completion = client.chat.completions.create(
+        client = _get_client(cfg.token)
+
+        # Stream the completion so we can stop as soon as the statement is
+        # complete instead of waiting for the model to finish its turn.
+        stream = client.chat.completions.create(
             model=cfg.model,
             messages=[{"role": "user", "content": prompt}],
             temperature=0,
+            max_tokens=256,
+            stream=True,
         )
-        
-        # Extract SQL from the response
-        sql = completion.choices[0].message.content
-        
+
+        parts: list[str] = []
+        try:
+            for chunk in stream:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if not delta:
+                    continue
+                parts.append(delta)
+                # A semicolon ends the single SELECT we asked for; anything the
+                # model would add after it is unusable anyway.
+                if ";" in delta:
+                    break
+        finally:
+            # Breaking out mid-stream must still close the underlying HTTP
+            # response, or the connection can't return to the client's
+            # keep-alive pool.
+            stream.close()
+        sql = "".join(parts)
+
         # Clean up the SQL (remove code fences if any)
         return _strip_code_fences(sql.strip())
-        
+
     except Exception as e:
         error_msg = str(e)
         raise HuggingFaceSqlGenError(f"HF request failed: {error_msg}")
 
 
+def generate_sql_hf_batch(questions: list[str], cfg: HfConfig) -> list[str]:
+    """
+    Generate SQL for several questions with a single chat completion.
+
+    The schema/rules preamble is shared across all questions, so one request
+    pays one prefill pass instead of one per question.
+    """
+    qs = [q.strip() for q in questions]
+    if not qs:
+        return []
+
+    numbered = "\n".join(f"{i}) {q}" for i, q in enumerate(qs, 1))
+    prompt = BATCH_PROMPT_TEMPLATE.format(questions=numbered)
+
+    try:
+        client = _get_client(cfg.token)
+        completion = client.chat.completions.create(
+            model=cfg.model,
+            messages=[{"role": "user", "content": prompt}],
+            temperature=0,
+            max_tokens=256 * len(qs),
+        )
+        text = _strip_code_fences(completion.choices[0].message.content.strip())
+        sqls = json.loads(text)
+    except Exception as e:
+        raise HuggingFaceSqlGenError(f"HF batch request failed: {e}")
+
+    if not isinstance(sqls, list) or len(sqls) != len(qs) or not all(isinstance(s, str) for s in sqls):
+        raise HuggingFaceSqlGenError(
+            f"HF batch response is not a JSON array of {len(qs)} SQL strings."
+        )
+    return [_strip_code_fences(s.strip()) for s in sqls]
+
+
 def hf_config_from_env() -> HfConfig | None:
     token = os.getenv("HF_TOKEN")
     if not token:
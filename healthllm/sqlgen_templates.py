@@ -1,23 +1,199 @@
 from __future__ import annotations
 
 import re
+import sys
 from dataclasses import dataclass
+from functools import lru_cache
+from textwrap import dedent
 
 
 class NoTemplateMatchError(ValueError):
     pass
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class TemplateMatch:
     sql: str
     matched_rule: str
 
 
+_WS_RE = re.compile(r"\s+")
+_TOP_N_RE = re.compile(r"top\s+(\d+)")
+
+
 def _norm(q: str) -> str:
-    q = q.strip().lower()
-    q = re.sub(r"\s+", " ", q)
-    return q
+    return _WS_RE.sub(" ", q.strip().lower())
+
+
+@dataclass(frozen=True)
+class _Rule:
+    """One routing rule: trigger phrases plus the SQL it renders."""
+
+    name: str
+    sql: str
+    any_of: tuple[str, ...] = ()  # at least one phrase must appear
+    all_of: tuple[str, ...] = ()  # every phrase must appear
+    pattern: re.Pattern[str] | None = None  # parameterized trigger; group 1 -> {n}
+
+
+def _freeze_sql(s: str) -> str:
+    """Finalize a template's SQL once at import: dedent, strip, intern."""
+    return sys.intern(dedent(s).strip())
+
+
+# Checked in order; the first matching rule wins, so more specific phrasing
+# (e.g. "top 7 days") must come before its generic fallback ("top ... day").
+_RULES: tuple[_Rule, ...] = (
+    _Rule(
+        name="sum_this_year",
+        any_of=("this year", "in 2025", "this yr"),
+        sql=_freeze_sql("""
+        SELECT COALESCE(SUM(steps), 0) AS answer
+        FROM daily_steps
+        WHERE date >= date_trunc('year', current_date)
+          AND date <  date_trunc('year', current_date) + INTERVAL '1 year'
+        """),
+    ),
+    _Rule(
+        name="sum_this_month",
+        any_of=("this month",),
+        sql=_freeze_sql("""
+        SELECT COALESCE(SUM(steps), 0) AS answer
+        FROM daily_steps
+        WHERE date >= date_trunc('month', current_date)
+          AND date <  date_trunc('month', current_date) + INTERVAL '1 month'
+        """),
+    ),
+    _Rule(
+        name="avg_per_day_all_time",
+        any_of=("average", "avg"),
+        sql=_freeze_sql("""
+        SELECT COALESCE(AVG(steps), 0) AS answer
+        FROM daily_steps
+        """),
+    ),
+    _Rule(
+        name="top_n_days",
+        pattern=_TOP_N_RE,
+        sql=_freeze_sql("""
+        SELECT date, steps
+        FROM daily_steps
+        ORDER BY steps DESC, date DESC
+        LIMIT {n}
+        """),
+    ),
+    _Rule(
+        name="top_10_days_default",
+        all_of=("top", "day"),
+        sql=_freeze_sql("""
+        SELECT date, steps
+        FROM daily_steps
+        ORDER BY steps DESC, date DESC
+        LIMIT 10
+        """),
+    ),
+    _Rule(
+        name="weekday_average",
+        any_of=("weekday", "day of week"),
+        sql=_freeze_sql("""
+        SELECT
+          strftime(date, '%w') AS weekday_num,
+          AVG(steps) AS avg_steps
+        FROM daily_steps
+        GROUP BY 1
+        ORDER BY 1
+        """),
+    ),
+    _Rule(
+        name="weekly_trend_last_12_weeks",
+        any_of=("trend", "weekly", "last 12 weeks"),
+        sql=_freeze_sql("""
+        SELECT
+          date_trunc('week', date) AS week_start,
+          SUM(steps) AS steps
+        FROM daily_steps
+        WHERE date >= current_date - INTERVAL '84 days'
+        GROUP BY 1
+        ORDER BY 1
+        """),
+    ),
+)
+
+
+# all_of phrases compiled per rule; these are the only triggers that still
+# need confirming at dispatch time. Rules use either any_of or all_of (never
+# both), so a candidate hit from an any_of phrase already proves its rule.
+_ALL_RES: tuple[tuple[re.Pattern[str], ...], ...] = tuple(
+    tuple(re.compile(re.escape(p)) for p in rule.all_of) for rule in _RULES
+)
+
+
+# Every trigger phrase from every rule as one capture-group branch, wrapped
+# in a zero-width lookahead so the scan tests every position. Branches are
+# sorted longest-first, so where phrases overlap at a position the longest
+# (most specific) one claims it. One pass yields the set of rules whose
+# triggers appear, and only those rules get fully checked.
+# Sentinel id for the steps-subject gate, scanned in the same pass as the
+# rule triggers ("step" also covers "steps" as a substring).
+_GATE = -1
+_GATE_PHRASES = ("step", "walk")
+
+_TRIGGER_BRANCHES: tuple[tuple[str, int], ...] = tuple(
+    sorted(
+        [
+            (re.escape(p), i)
+            for i, rule in enumerate(_RULES)
+            for p in (*rule.any_of, *rule.all_of)
+        ]
+        + [(re.escape(p), _GATE) for p in _GATE_PHRASES]
+        + [
+            # Strip the capture group so branch numbering stays one-per-phrase.
+            (re.sub(r"\((?!\?)", "(?:", rule.pattern.pattern), i)
+            for i, rule in enumerate(_RULES)
+            if rule.pattern is not None
+        ],
+        key=lambda t: (-len(t[0]), t[0]),
+    )
+)
+_BRANCH_RULE: tuple[int, ...] = tuple(i for _, i in _TRIGGER_BRANCHES)
+_CANDIDATE_SCAN_RE = re.compile("(?=" + "|".join(f"({pat})" for pat, _ in _TRIGGER_BRANCHES) + ")")
+
+
+def _scan_question(q: str) -> tuple[bool, set[int]]:
+    """One pass over the question: (step words present, candidate rule ids)."""
+    ids = {_BRANCH_RULE[m.lastindex - 1] for m in _CANDIDATE_SCAN_RE.finditer(q)}
+    has_step_words = _GATE in ids
+    ids.discard(_GATE)
+    return has_step_words, ids
+
+
+# The match loop reads these parallel tuples (indexed by rule id) instead of
+# the _Rule objects, so a dispatch touches a few flat arrays rather than one
+# attribute lookup per field; _RULES stays the single source of truth they
+# are all derived from.
+_NAMES: tuple[str, ...] = tuple(rule.name for rule in _RULES)
+_PATTERNS: tuple[re.Pattern[str] | None, ...] = tuple(rule.pattern for rule in _RULES)
+
+# Parameterless rules always render the same SQL, so their TemplateMatch is a
+# shared singleton built at import; matching them allocates nothing. The
+# parameterized top-N SQL is pre-split around its {n} slot and rendered by
+# concatenation instead of str.format.
+_STATIC_MATCHES: tuple[TemplateMatch | None, ...] = tuple(
+    None if rule.pattern is not None else TemplateMatch(sql=rule.sql, matched_rule=rule.name)
+    for rule in _RULES
+)
+_SQL_PARTS: tuple[tuple[str, str] | None, ...] = tuple(
+    tuple(rule.sql.split("{n}", 1)) if rule.pattern is not None else None
+    for rule in _RULES
+)
+
+
+@lru_cache(maxsize=256)
+def _pattern_match(i: int, n: int) -> TemplateMatch:
+    # n is clamped to 1..50 before we get here, so each rendered variant is
+    # built once and shared afterwards, like the static singletons.
+    before, after = _SQL_PARTS[i]
+    return TemplateMatch(matched_rule=_NAMES[i], sql=before + str(n) + after)
 
 
 def generate_sql_from_templates(question: str) -> TemplateMatch:
@@ -26,97 +202,33 @@ def generate_sql_from_templates(question: str) -> TemplateMatch:
 
     This exists so the app works without an HF token and so tests can run deterministically.
     """
-    q = _norm(question)
+    return _match_normalized(_norm(question))
 
-    if "steps" not in q and "walk" not in q and "step" not in q:
-        raise NoTemplateMatchError("This v1 only supports step questions.")
 
-    # Single-number queries (alias answer)
-    if "this year" in q or "in 2025" in q or "this yr" in q:
-        return TemplateMatch(
-            matched_rule="sum_this_year",
-            sql="""
-            SELECT COALESCE(SUM(steps), 0) AS answer
-            FROM daily_steps
-            WHERE date >= date_trunc('year', current_date)
-              AND date <  date_trunc('year', current_date) + INTERVAL '1 year'
-            """.strip(),
-        )
-
-    if "this month" in q:
-        return TemplateMatch(
-            matched_rule="sum_this_month",
-            sql="""
-            SELECT COALESCE(SUM(steps), 0) AS answer
-            FROM daily_steps
-            WHERE date >= date_trunc('month', current_date)
-              AND date <  date_trunc('month', current_date) + INTERVAL '1 month'
-            """.strip(),
-        )
-
-    if "average" in q or "avg" in q:
-        # Default: average steps per day over all available data.
-        return TemplateMatch(
-            matched_rule="avg_per_day_all_time",
-            sql="""
-            SELECT COALESCE(AVG(steps), 0) AS answer
-            FROM daily_steps
-            """.strip(),
-        )
-
-    # Table-shaped queries
-    m = re.search(r"top\s+(\d+)", q)
-    if m:
-        n = int(m.group(1))
-        n = max(1, min(n, 50))
-        return TemplateMatch(
-            matched_rule="top_n_days",
-            sql=f"""
-            SELECT date, steps
-            FROM daily_steps
-            ORDER BY steps DESC, date DESC
-            LIMIT {n}
-            """.strip(),
-        )
-
-    if "top" in q and "day" in q:
-        return TemplateMatch(
-            matched_rule="top_10_days_default",
-            sql="""
-            SELECT date, steps
-            FROM daily_steps
-            ORDER BY steps DESC, date DESC
-            LIMIT 10
-            """.strip(),
-        )
-
-    if "weekday" in q or "day of week" in q:
-        return TemplateMatch(
-            matched_rule="weekday_average",
-            sql="""
-            SELECT
-              strftime(date, '%w') AS weekday_num,
-              AVG(steps) AS avg_steps
-            FROM daily_steps
-            GROUP BY 1
-            ORDER BY 1
-            """.strip(),
-        )
-
-    if "trend" in q or "weekly" in q or "last 12 weeks" in q:
-        return TemplateMatch(
-            matched_rule="weekly_trend_last_12_weeks",
-            sql="""
-            SELECT
-              date_trunc('week', date) AS week_start,
-              SUM(steps) AS steps
-            FROM daily_steps
-            WHERE date >= current_date - INTERVAL '84 days'
-            GROUP BY 1
-            ORDER BY 1
-            """.strip(),
-        )
+@lru_cache(maxsize=1024)
+def _match_normalized(q: str) -> TemplateMatch:
+    # TemplateMatch is frozen, so cached hits can be shared freely. Phrasing
+    # variants collapse onto one entry via _norm.
+    has_step_words, candidates = _scan_question(q)
+    if not has_step_words:
+        raise NoTemplateMatchError("This v1 only supports step questions.")
+    if not candidates:
+        raise NoTemplateMatchError("No matching template rule for this question yet.")
+
+    # Sorted candidate ids preserve the rules table's priority order. The
+    # scan already proved any_of rules, so most dispatches return the lowest
+    # candidate id's singleton without touching the question again; only the
+    # parameterized rule (to capture N) and all_of rules re-search.
+    for i in sorted(candidates):
+        pattern = _PATTERNS[i]
+        if pattern is not None:
+            m = pattern.search(q)
+            if m:
+                return _pattern_match(i, max(1, min(int(m.group(1)), 50)))
+            continue
+        all_res = _ALL_RES[i]
+        if all_res and not all(p.search(q) for p in all_res):
+            continue
+        return _STATIC_MATCHES[i]
 
     raise NoTemplateMatchError("No matching template rule for this question yet.")
-
-
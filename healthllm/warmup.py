@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+import threading
+from pathlib import Path
+
+from healthllm.qa import _get_con
+from healthllm.sqlgen_hf import HfConfig, _get_client
+
+_started = False
+_started_lock = threading.Lock()
+
+
+def _warm_db(db_path: str) -> None:
+    try:
+        # Opens (and caches) the shared connection and touches the table's
+        # pages so the first real question hits a warm OS page cache.
+        cur = _get_con(db_path).cursor()
+        cur.execute("SELECT COUNT(*) FROM daily_steps").fetchone()
+    except Exception:
+        # Warmup is best-effort; the real query path reports its own errors.
+        pass
+
+
+def _warm_hf(cfg: HfConfig) -> None:
+    try:
+        # A one-token completion kicks off model load on the provider side
+        # and establishes the client's TLS session.
+        _get_client(cfg.token).chat.completions.create(
+            model=cfg.model,
+            messages=[{"role": "user", "content": "SELECT 1"}],
+            temperature=0,
+            max_tokens=1,
+        )
+    except Exception:
+        pass
+
+
+def prewarm(db_path: str | Path, hf_cfg: HfConfig | None = None) -> None:
+    """
+    Warm the DuckDB page cache and the HF endpoint in background threads.
+
+    Call once at process start; repeat calls are no-ops. Never blocks and
+    never raises — cold-start latency just moves off the first question.
+    """
+    global _started
+    with _started_lock:
+        if _started:
+            return
+        _started = True
+
+    resolved = str(Path(db_path).expanduser().resolve())
+    threading.Thread(target=_warm_db, args=(resolved,), name="warmup-db", daemon=True).start()
+    if hf_cfg is not None:
+        threading.Thread(target=_warm_hf, args=(hf_cfg,), name="warmup-hf", daemon=True).start()
@@ -36,3 +36,26 @@ def test_ingest_steps_export_xml_aggregates_by_day(tmp_path: Path) -> None:
     con.close()
 
 
+def test_ingest_steps_export_xml_handles_no_step_records(tmp_path: Path) -> None:
+    xml = """<?xml version="1.0" encoding="UTF-8"?>
+    <HealthData locale="en_US">
+      <Record type="HKQuantityTypeIdentifierHeartRate" sourceName="Watch" unit="count/min" value="80"
+              startDate="2025-01-01 10:00:00 -0700" endDate="2025-01-01 10:01:00 -0700"/>
+    </HealthData>
+    """
+
+    xml_path = tmp_path / "export.xml"
+    xml_path.write_text(xml, encoding="utf-8")
+    db_path = tmp_path / "test.duckdb"
+
+    res = ingest_steps_export_xml(xml_path=xml_path, db_path=db_path, overwrite=True)
+    assert res.days == 0
+    assert res.records_seen == 1
+    assert res.step_records_seen == 0
+
+    con = duckdb.connect(str(db_path))
+    assert con.execute("SELECT COUNT(*) FROM daily_steps").fetchone()[0] == 0
+    assert con.execute("SELECT row_count FROM data_source").fetchone()[0] == 0
+    con.close()
+
+
@@ -21,3 +21,31 @@ def test_validate_sql_rejects_other_tables() -> None:
         validate_sql("SELECT * FROM users", SqlPolicy(allowed_tables=("daily_steps",)))
 
 
+def test_validate_sql_allows_cte_references() -> None:
+    sql = (
+        "WITH t AS (SELECT date, steps FROM daily_steps), "
+        "u AS (SELECT * FROM t) "
+        "SELECT * FROM u"
+    )
+    out = validate_sql(sql, SqlPolicy(allowed_tables=("daily_steps",)))
+    assert "WITH" in out.upper()
+
+
+def test_validate_sql_rejects_table_smuggled_as_column_alias() -> None:
+    # A column alias inside a CTE body must not whitelist a table name for
+    # the rest of the statement.
+    sql = (
+        "WITH t AS (SELECT data_source AS x FROM daily_steps) "
+        "SELECT * FROM data_source"
+    )
+    with pytest.raises(UnsafeSQLError):
+        validate_sql(sql, SqlPolicy(allowed_tables=("daily_steps",)))
+
+
+def test_validate_sql_rejects_alias_without_cte_body() -> None:
+    # "name AS" without an opening paren is not a CTE declaration.
+    sql = "WITH data_source AS SELECT * FROM data_source"
+    with pytest.raises(UnsafeSQLError):
+        validate_sql(sql, SqlPolicy(allowed_tables=("daily_steps",)))
+
+